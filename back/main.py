@@ -1,70 +1,283 @@
 
-from fastapi import FastAPI, Form, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
 from test_backend import SingleFileModularityAnalyzer
-import tempfile
+from collections import OrderedDict
+from typing import List
+from urllib.parse import parse_qs
+from concurrent.futures import ProcessPoolExecutor
+import ast
+import asyncio
+import copy
+import hashlib
 import os
 
-app = FastAPI(title="Code Analyzer API")
+app = FastAPI(title="Code Analyzer API", default_response_class=ORJSONResponse)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# Cache of finished summaries keyed by a hash of the submitted source, so
+# re-submitting the same buffer doesn't re-run the whole analyzer.
+_RESULT_CACHE: OrderedDict[str, dict] = OrderedDict()
+_CACHE_MAX = 512
+_cache_lock = asyncio.Lock()
+
+
+# Micro-batching: concurrent submissions are drained together so the pool
+# gets one batch-sized job instead of many tiny dispatches.
+_MAX_BATCH = 16
+_MAX_WAIT_S = 0.02
+_MAX_QUEUE = 256
+
+
+@app.on_event("startup")
+async def _startup():
+    # One pool per worker; the analyzer is CPU-bound so processes sidestep the GIL.
+    app.state.pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    app.state.queue = asyncio.Queue(maxsize=_MAX_QUEUE)
+    app.state.batch_task = asyncio.create_task(_batch_worker())
+    # Caps in-flight analyses so a burst can't hold hundreds of ASTs in
+    # memory at once; waiters past the timeout are shed with a 503.
+    app.state.sem = asyncio.Semaphore(os.cpu_count() * 2)
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    app.state.batch_task.cancel()
+    app.state.pool.shutdown()
+
+
+async def _batch_worker():
+    """Drain queued submissions in small batches and dispatch them to the pool."""
+    loop = asyncio.get_running_loop()
+    queue = app.state.queue
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + _MAX_WAIT_S
+        while len(batch) < _MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            results = await loop.run_in_executor(
+                app.state.pool, _run_analysis_batch, [code for code, _ in batch]
+            )
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            continue
+
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+
+# Per-process analyzer instance, reset per request instead of re-constructed.
+_analyzer = None
+
+_EMPTY: dict = {}
+
+# (response key, complexity_scores key) pairs for the summary block.
+_SUMMARY_FIELDS = (
+    ("total_functions", "function_count"),
+    ("total_classes", "class_count"),
+    ("average_complexity", "average_complexity"),
+    ("max_complexity", "max_complexity"),
+    ("maintainability", "maintainability"),
+    ("sloc", "size"),
 )
 
 
+def _run_analysis(code_str: str) -> dict:
+    """Run the full analysis pipeline and build the response summary.
+
+    Module-level (picklable) so it can execute on a pool worker.
+    """
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SingleFileModularityAnalyzer.from_source(code_str)
+    else:
+        _analyzer.reset(code_str)
+    analyzer = _analyzer
+    suggestions = analyzer.analyze_file()
+
+    scores_get = (analyzer.complexity_scores or _EMPTY).get
+    summary = {key: scores_get(score_key, 0) for key, score_key in _SUMMARY_FIELDS}
+
+    summary["cohesion"] = getattr(analyzer, "cohesion", 0.0)
+
+    summary["results"] = suggestions
+    return summary
+
+
+def _run_analysis_batch(codes: List[str]) -> List[dict]:
+    """Analyze a whole batch on one worker, amortizing dispatch overhead."""
+    return [_run_analysis(code) for code in codes]
+
+class FastCORS:
+    """Minimal CORS layer for this single-endpoint, allow-all API.
+
+    Answers preflights directly with constant headers and injects the
+    allow-origin header on responses, skipping Starlette's per-request
+    origin/method/header matching.
+    """
+
+    _PREFLIGHT_HEADERS = [
+        (b"access-control-allow-origin", b"*"),
+        (b"access-control-allow-methods", b"POST, OPTIONS"),
+        (b"access-control-allow-headers", b"*"),
+    ]
+    _ALLOW_ORIGIN = (b"access-control-allow-origin", b"*")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS":
+            await send({
+                "type": "http.response.start",
+                "status": 204,
+                "headers": self._PREFLIGHT_HEADERS,
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [self._ALLOW_ORIGIN]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+app.add_middleware(FastCORS)
+
+# Suggestion payloads are repetitive JSON and compress 5-10x; level 4 gets
+# most of that at a fraction of the CPU of the default level.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=4)
+
+
+@app.exception_handler(SyntaxError)
+async def _syntax_error_handler(request: Request, exc: SyntaxError):
+    return ORJSONResponse(
+        status_code=400,
+        content={"detail": f"SyntaxError: {exc.msg} at line {exc.lineno}"},
+    )
+
+
+@app.exception_handler(Exception)
+async def _unhandled_error_handler(request: Request, exc: Exception):
+    return ORJSONResponse(status_code=500, content={"detail": str(exc)})
+
+
+_MAX_BODY_BYTES = 2 * 1024 * 1024
+
+
+class AnalyzeReq(BaseModel):
+    """JSON body for /analyze; the length cap is enforced in pydantic-core."""
+
+    code: str = Field(..., max_length=512_000)
+
+
 @app.post("/analyze")
-async def analyze(code: str = Form(...)):
+async def analyze(request: Request):
     """
     Accepts a Python source code string, runs modularity analysis,
     and returns both summary metrics and detailed refactor suggestions.
     """
-    code_str = (code or "").strip()
+    content_length = request.headers.get("content-length")
+    if content_length and int(content_length) > _MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="Source too large.")
+
+    # Read the body incrementally instead of letting form parsing buffer
+    # and decode the whole thing up front.
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > _MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Source too large.")
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        # Parsed and length-checked in pydantic-core, far faster than the
+        # form parser and without percent-encoding the source.
+        try:
+            code_str = AnalyzeReq.model_validate_json(bytes(body)).code
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    elif content_type.startswith("application/x-www-form-urlencoded"):
+        # Back-compat for form clients.
+        fields = parse_qs(body.decode("utf-8", errors="replace"))
+        code_str = fields.get("code", [""])[0]
+    else:
+        code_str = body.decode("utf-8", errors="replace")
+
+    code_str = code_str.strip()
     if not code_str:
         raise HTTPException(status_code=400, detail="Empty code submitted.")
 
-    tmp_path = None
+    # Cheap syntax pre-check so invalid submissions are rejected here in
+    # microseconds instead of occupying a pool worker. The tree itself is
+    # discarded: shipping it across the process boundary would cost more
+    # than the worker's own parse.
+    try:
+        ast.parse(code_str)
+    except SyntaxError as e:
+        raise HTTPException(
+            status_code=400, detail=f"SyntaxError: {e.msg} at line {e.lineno}"
+        )
+
+    cache_key = hashlib.blake2b(code_str.encode("utf-8"), digest_size=16).hexdigest()
+    async with _cache_lock:
+        if cache_key in _RESULT_CACHE:
+            _RESULT_CACHE.move_to_end(cache_key)
+            return copy.copy(_RESULT_CACHE[cache_key])
+
+    try:
+        await asyncio.wait_for(app.state.sem.acquire(), timeout=2.0)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Server busy, try again shortly.")
+
     try:
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=".py", mode="w", encoding="utf-8"
-        ) as tmp:
-            tmp.write(code_str)
-            tmp_path = tmp.name
-
-        analyzer = SingleFileModularityAnalyzer(tmp_path)
-        suggestions = analyzer.analyze_file()
-
-        complexity = getattr(analyzer, "complexity_scores", {}) or {}
-        summary = {
-            "total_functions": complexity.get("function_count", 0),
-            "total_classes": complexity.get("class_count", 0),
-            "average_complexity": complexity.get("average_complexity", 0),
-            "max_complexity": complexity.get("max_complexity", 0),
-            "maintainability": complexity.get("maintainability", 0),
-            "sloc": complexity.get("size", 0),
-        }
-
-        cohesion_val = 0.0
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
         try:
-            if hasattr(analyzer, "_calculate_file_cohesion"):
-                cohesion_val = analyzer._calculate_file_cohesion() or 0.0
-        except Exception:
-            cohesion_val = 0.0
-        summary["cohesion"] = cohesion_val
+            app.state.queue.put_nowait((code_str, fut))
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Server busy, try again shortly.")
 
-        summary["results"] = suggestions
+        summary = await fut
+    finally:
+        app.state.sem.release()
 
-        import json
-        print(json.dumps(summary, indent=2))
+    async with _cache_lock:
+        _RESULT_CACHE[cache_key] = summary
+        if len(_RESULT_CACHE) > _CACHE_MAX:
+            _RESULT_CACHE.popitem(last=False)
 
-        return summary
+    return summary
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop + httptools beat the default asyncio/h11 stack by a wide margin,
+    # and multiple workers let the CPU-bound analyzer scale across cores.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
+    )
@@ -3,11 +3,185 @@ import os
 from pathlib import Path
 from typing import List, Dict, Any, Tuple, Set
 import difflib
-from radon.complexity import cc_visit
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from radon.complexity import cc_visit_ast
 from radon.metrics import mi_visit
 from radon.raw import analyze as raw_analyze
+import hashlib
+import heapq
 import json
-from collections import defaultdict
+import logging
+import re
+import sys
+from collections import Counter, defaultdict
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+# orjson serializes several times faster than the stdlib; the API server
+# already depends on it (ORJSONResponse), but keep the analyzer usable
+# standalone without it.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Progress/debug output goes through logging so a disabled level costs one
+# check instead of a synchronous stdout write per pipeline step.
+logger = logging.getLogger(__name__)
+
+# On-disk result cache for path-backed analyses (keyed by source hash).
+_CACHE_DIR = Path('.cache')
+
+# Matches a stripped code line: skips blank and comment-only lines, trims
+# leading/trailing whitespace from everything else.
+_CODE_LINE_RE = re.compile(r'^[ \t]*([^#\s][^\n]*?)[ \t\r]*$', re.MULTILINE)
+
+# Similarity scoring fans out to worker processes only past this many
+# surviving candidate pairs; below it, pickling the strings and spinning up
+# workers costs more than scoring inline.
+_PARALLEL_PAIR_THRESHOLD = 512
+_PAIRS_PER_CHUNK = 256
+
+# Issue thresholds for _identify_modularity_issues, hoisted so each check
+# loads a constant instead of rebuilding the literal in place and the
+# limits are tunable from one spot.
+_MAX_FILE_SLOC = 500
+_MAX_FUNCTION_COUNT = 20
+_MAX_COMPLEXITY = 10
+_HIGH_SIMILARITY = 0.85
+_MAX_ORPHAN_FUNCTIONS = 5
+_MAX_FUNCTION_LINES = 50
+_MIN_MAINTAINABILITY = 65
+_MIN_COHESION = 0.3
+_MIN_COHESION_FUNCTIONS = 10
+_MIN_PROCEDURAL_FUNCTIONS = 15
+
+# Summary chrome, built once instead of a fresh 80/40-char string per use.
+_BAR = "=" * 80
+_RULE = "-" * 40
+
+# Display order for the severity breakdown.
+_SEVERITY_ORDER = ('critical', 'high', 'medium', 'low')
+
+
+@functools.lru_cache(maxsize=1024)
+def _build_step_diff(step_key: Tuple) -> Tuple[str, str]:
+    """Render one canonicalised refactoring step into (title, diff text).
+
+    The key is the step's content, not its identity, so equal steps from
+    different dicts (or renders) hit the same cache entry. Each branch
+    collects lines and joins once; repeated += on a string re-copies the
+    accumulated text on every append.
+    """
+    kind = step_key[0]
+    if kind == 'break_down_function':
+        _, function, line, complexity, description = step_key
+        # Fixed shape, so one f-string: the literal stretches are folded
+        # into constants at compile time and nothing is joined at runtime.
+        diff_text = f"""\
+=== {function} (line {line}) ===
+Complexity: {complexity}
+Suggestion: {description}
+
+# Example refactoring:
+- def {function}(...):
+-     # Long complex function
++
++ def {function}_part1(...):
++     # First responsibility
++
++ def {function}_part2(...):
++     # Second responsibility
+"""
+        return f"Break down {function}", diff_text
+
+    if kind == 'extract_methods':
+        _, function, line, lines, description = step_key
+        diff_text = (f"=== {function} (line {line}) ===\n"
+                     f"Length: {lines} lines\n"
+                     f"Suggestion: {description}\n")
+        return f"Split {function}", diff_text
+
+    if kind == 'create_module':
+        _, name, description, functions = step_key
+        parts = [f"=== New module: {name} ===", f"{description}"]
+        parts.extend(f"  - {func_name}" for func_name in functions[:5])
+        if len(functions) > 5:
+            parts.append(f"  ... and {len(functions) - 5} more")
+        return f"Create {name}", "\n".join(parts) + "\n"
+
+    # identify_common_code
+    _, description, duplicate_pairs = step_key
+    parts = [f"=== {description} ==="]
+    parts.extend(f"  {func1} <-> {func2}" for func1, func2 in duplicate_pairs[:5])
+    return 'Extract shared helper', "\n".join(parts) + "\n"
+
+
+@functools.lru_cache(maxsize=256)
+def _pretty(tag: str) -> str:
+    """Display form of an issue/action/step tag ('god_functions' -> 'God Functions').
+
+    The tags come from a small fixed vocabulary, so the cache turns two
+    string scans and allocations per use into a dict hit.
+    """
+    return tag.replace('_', ' ').title()
+
+
+def _score_pair_chunk(pairs: List[Tuple[int, int, str, str]]) -> List[Tuple[int, int, float]]:
+    """Score one chunk of (i, j, norm1, norm2) candidate pairs.
+
+    Module-level so it pickles for process workers; also used for the
+    inline path. Pairs arrive grouped by j, so seq2's match index is
+    rebuilt only when j changes. Returns (i, j, ratio) for pairs over
+    the 70% threshold.
+    """
+    matcher = difflib.SequenceMatcher()
+    scored = []
+    last_j = None
+    for i, j, norm1, norm2 in pairs:
+        if j != last_j:
+            matcher.set_seq2(norm2)
+            last_j = j
+        matcher.set_seq1(norm1)
+        # real_quick_ratio is O(1) and quick_ratio O(n+m); both are upper
+        # bounds on ratio(), so dissimilar pairs bail out before the full
+        # O(n*m) matcher runs.
+        if matcher.real_quick_ratio() <= 0.7 or matcher.quick_ratio() <= 0.7:
+            continue
+        similarity = matcher.ratio()
+        if similarity > 0.7:
+            scored.append((i, j, similarity))
+    return scored
+
+
+class FunctionInfo:
+    """Per-function record.
+
+    __slots__ keeps the many records a large file produces compact, and
+    turns the hot field accesses in the relationship/issue passes into
+    fixed-offset loads instead of dict probes.
+    """
+
+    __slots__ = ('name', 'lineno', 'end_lineno', 'line_count', 'args', 'calls',
+                 'returns', 'is_private', 'source', 'decorators', 'complexity')
+
+    def __init__(self, name: str, lineno: int, end_lineno: int, args: List[str],
+                 calls: List[str], returns: bool, is_private: bool,
+                 source: str, decorators: List[str], complexity: int = 0):
+        self.name = name
+        self.lineno = lineno
+        self.end_lineno = end_lineno
+        # Known from the line numbers, so length checks never have to split
+        # the source text.
+        self.line_count = end_lineno - lineno + 1 if end_lineno else 0
+        self.args = args
+        self.calls = calls
+        self.returns = returns
+        self.is_private = is_private
+        self.source = source
+        self.decorators = decorators
+        self.complexity = complexity
 
 
 class SingleFileModularityAnalyzer:
@@ -19,150 +193,214 @@ class SingleFileModularityAnalyzer:
     
     def __init__(self, file_path: str):
         self.file_path = Path(file_path)
-        print(file_path)
+        logger.debug("Initializing analyzer for %s", file_path)
         if not self.file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
         if not self.file_path.suffix == '.py':
             raise ValueError(f"File must be a Python file: {file_path}")
-        
 
+        self.reset('', str(self.file_path))
+
+    @classmethod
+    def from_source(cls, source: str, name: str = "<submitted>",
+                    tree: ast.AST = None) -> 'SingleFileModularityAnalyzer':
+        """Build an analyzer directly from a source string, skipping disk entirely."""
+        return cls.__new__(cls).reset(source, name, tree)
+
+    def reset(self, source: str, name: str = "<submitted>",
+              tree: ast.AST = None) -> 'SingleFileModularityAnalyzer':
+        """Clear per-file state so one instance can be reused across analyses."""
+        self.file_path = Path(name)
         self.module_data = {
-            'path': str(self.file_path),
-            'ast_tree': None,
+            'path': name,
+            'ast_tree': tree,
             'functions': [],
             'classes': [],
             'imports': [],
             'metrics': {},
-            'source': ''
+            'source': source
         }
         self.function_relationships = {}
         self.duplication_map = {}
         self.complexity_scores = {}
-        
+        self.cohesion = 1.0
+        self._severity_counts = Counter()
+        self._type_counts = Counter()
+        return self
+
     def analyze_file(self) -> List[Dict[str, Any]]:
         """Main analysis pipeline for single file."""
-        print(f"Analyzing file: {self.file_path}\n")
-        
-        #Load and parse file
-        with open(self.file_path, 'r', encoding='utf-8') as f:
-            self.module_data['source'] = f.read()
-        
+        logger.info("Analyzing file: %s", self.file_path)
+
+        #Load and parse file (skipped when built via from_source)
+        if not self.module_data['source']:
+            # Binary read plus one bulk decode beats text mode, which runs
+            # the incremental decoder and newline translation over the file.
+            with open(self.file_path, 'rb') as f:
+                self.module_data['source'] = f.read().decode('utf-8')
+
+        # On-disk memoization for real files: identical source means an
+        # identical result, so a warm cache skips the entire pipeline.
+        # In-memory submissions are cached upstream by the API instead.
+        cache_path = mtime = None
+        try:
+            mtime = self.file_path.stat().st_mtime
+        except OSError:
+            pass
+        if mtime is not None:
+            source_hash = hashlib.sha256(self.module_data['source'].encode('utf-8')).hexdigest()
+            cache_path = _CACHE_DIR / f"{source_hash}.json"
+            cached = self._load_cached_result(cache_path, mtime)
+            if cached is not None:
+                return cached
+
         # Step 2: AST Analysis
-        print("Running AST analysis...")
+        logger.debug("Running AST analysis...")
         self._ast_analyze()
         
         # Step 3: Radon Metrics
-        print("Running Radon analysis...")
+        logger.debug("Running Radon analysis...")
         self._radon_analyze()
         
         # Step 4: Difflib Comparison (within file)
-        print("Running difflib analysis...")
+        logger.debug("Running difflib analysis...")
         self._difflib_analyze()
         
         # Step 5: Identify issues
-        print("Identifying modularity issues...")
+        logger.debug("Identifying modularity issues...")
         issues = self._identify_modularity_issues()
         
         # Step 6: Generate suggestions
-        print("Generating refactoring suggestions...")
+        logger.debug("Generating refactoring suggestions...")
         suggestions = self._generate_refactoring_plan(issues)
-        
+
+        if cache_path is not None:
+            self._store_cached_result(cache_path, mtime, suggestions)
+
         return suggestions
-    
-    
+
+    def _load_cached_result(self, cache_path: Path, mtime: float):
+        """Return cached suggestions if still valid, restoring report state.
+
+        Restores everything print_summary reads — scores, cohesion, the
+        per-function records, and the relationship table — so a warm-cache
+        run renders the same report as a cold one. Entries written by an
+        older cache format miss the extra keys and fall through to a cold
+        run via the KeyError arm.
+        """
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached['mtime'] != mtime:
+                return None
+            self.complexity_scores = cached['complexity_scores']
+            self.cohesion = cached['cohesion']
+            self.module_data['functions'] = [
+                FunctionInfo(
+                    name=func['name'],
+                    lineno=func['lineno'],
+                    end_lineno=func['end_lineno'],
+                    args=[],
+                    calls=[],
+                    returns=False,
+                    is_private=func['name'].startswith('_'),
+                    source='',
+                    decorators=[],
+                    complexity=func['complexity']
+                )
+                for func in cached['functions']
+            ]
+            self.function_relationships = cached['relationships']
+            suggestions = cached['suggestions']
+            self._count_issue_buckets(suggestions)
+            return suggestions
+        except (OSError, ValueError, KeyError, TypeError):
+            # TypeError covers corrupted entries with the wrong JSON shape
+            # (top-level array, non-object function records, ...).
+            return None
+
+    def _store_cached_result(self, cache_path: Path, mtime: float, suggestions: List[Dict[str, Any]]):
+        """Persist the analysis result; failures just mean a cold cache."""
+        try:
+            _CACHE_DIR.mkdir(exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'mtime': mtime,
+                    'complexity_scores': self.complexity_scores,
+                    'cohesion': self.cohesion,
+                    # Compact per-function records: just the fields the
+                    # summary leaderboards read back.
+                    'functions': [
+                        {'name': func.name, 'lineno': func.lineno,
+                         'end_lineno': func.end_lineno, 'complexity': func.complexity}
+                        for func in self.module_data['functions']
+                    ],
+                    'relationships': self.function_relationships,
+                    'suggestions': suggestions
+                }, f)
+        except (OSError, TypeError):
+            pass
+
+
     def _ast_analyze(self):
         """Perform AST analysis on the file."""
         try:
             source_code = self.module_data['source']
-            self.module_data['ast_tree'] = ast.parse(source_code, filename=str(self.file_path))
-            
+            if self.module_data['ast_tree'] is None:
+                self.module_data['ast_tree'] = ast.parse(source_code, filename=str(self.file_path))
+
             self._extract_ast_info(source_code)
             
             self._build_function_relationships()
             
         except Exception as e:
-            print(f"Error parsing file: {e}")
+            logger.error("Error parsing file: %s", e)
             raise
     
     def _extract_ast_info(self, source_code: str):
-        """Extract functions, classes, and imports from AST."""
-        for node in ast.walk(self.module_data['ast_tree']):
-            if isinstance(node, ast.FunctionDef):
-                function_info = {
-                    'name': node.name,
-                    'lineno': node.lineno,
-                    'end_lineno': node.end_lineno,
-                    'args': self._extract_arguments(node),
-                    'calls': self._extract_calls(node),
-                    'returns': self._has_return(node),
-                    'is_private': node.name.startswith('_'),
-                    'source': ast.get_source_segment(source_code, node) or '',
-                    'decorators': [self._get_decorator_name(d) for d in node.decorator_list]
-                }
-                self.module_data['functions'].append(function_info)
-            
-            elif isinstance(node, ast.ClassDef):
-                class_info = {
-                    'name': node.name,
-                    'lineno': node.lineno,
-                    'end_lineno': node.end_lineno,
-                    'methods': [n.name for n in node.body if isinstance(n, ast.FunctionDef)],
-                    'bases': [self._get_name(base) for base in node.bases],
-                    'source': ast.get_source_segment(source_code, node) or '',
-                    'is_private': node.name.startswith('_')
-                }
-                self.module_data['classes'].append(class_info)
-            
-            elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                import_info = self._extract_import_info(node)
-                self.module_data['imports'].append(import_info)
-    
+        """Extract functions, classes, and imports from AST in one pass."""
+        collector = _AstCollector(self, source_code)
+        collector.collect(self.module_data['ast_tree'])
+        self.module_data['functions'] = collector.functions
+        self.module_data['classes'] = collector.classes
+        self.module_data['imports'] = collector.imports
+
     def _extract_arguments(self, node: ast.FunctionDef) -> List[str]:
         """Extract function arguments."""
         args = []
         for arg in node.args.args:
             args.append(arg.arg)
-        print(args)
         return args
-    
-    def _extract_calls(self, node: ast.FunctionDef) -> List[str]:
-        """Extract function calls within a function."""
-        calls = []
-        for child in ast.walk(node):
-            if isinstance(child, ast.Call):
-                call_name = self._get_call_name(child)
-                if call_name:
-                    calls.append(call_name)
-        return calls
-    
-    def _has_return(self, node: ast.FunctionDef) -> bool:
-        """Check if function has return statement."""
-        for child in ast.walk(node):
-            if isinstance(child, ast.Return) and child.value is not None:
-                return True
-        return False
-    
+
     def _get_call_name(self, node: ast.Call) -> str:
         """Get the name of a function call."""
-        if isinstance(node.func, ast.Name):
-            return node.func.id
-        elif isinstance(node.func, ast.Attribute):
-            return node.func.attr
+        # Exact class checks: ast nodes are never subclassed here, and this
+        # runs once per call expression in the file.
+        func = node.func
+        cls = func.__class__
+        if cls is ast.Name:
+            return func.id
+        if cls is ast.Attribute:
+            return func.attr
         return ''
     
     def _get_name(self, node: ast.AST) -> str:
         """Get name from various AST node types."""
-        if isinstance(node, ast.Name):
-            return node.id
-        elif isinstance(node, ast.Attribute):
-            return f"{self._get_name(node.value)}.{node.attr}"
-        return ''
-    
+        # Walk attribute chains with a loop, collecting the dotted parts
+        # without a recursive call frame per link.
+        parts = []
+        while node.__class__ is ast.Attribute:
+            parts.append(node.attr)
+            node = node.value
+        parts.append(node.id if node.__class__ is ast.Name else '')
+        return '.'.join(reversed(parts))
+
     def _get_decorator_name(self, node: ast.AST) -> str:
         """Get decorator name."""
-        if isinstance(node, ast.Name):
+        cls = node.__class__
+        if cls is ast.Name:
             return node.id
-        elif isinstance(node, ast.Call):
+        if cls is ast.Call:
             return self._get_name(node.func)
         return ''
     
@@ -189,33 +427,68 @@ class SingleFileModularityAnalyzer:
         functions = self.module_data['functions']
         
         for func in functions:
-            self.function_relationships[func['name']] = {
-                'calls': func['calls'],
+            self.function_relationships[func.name] = {
+                'calls': func.calls,
                 'called_by': [],
                 'related_functions': []
             }
         
         # Find which functions call each other
         for func in functions:
-            for call in func['calls']:
+            for call in func.calls:
                 if call in self.function_relationships:
-                    self.function_relationships[call]['called_by'].append(func['name'])
+                    self.function_relationships[call]['called_by'].append(func.name)
         
-        # Find related functions (share common calls or data)
-        for i, func1 in enumerate(functions):
-            for func2 in functions[i+1:]:
-                shared_calls = set(func1['calls']) & set(func2['calls'])
-                if len(shared_calls) >= 2:  # Share at least 2 common calls
-                    self.function_relationships[func1['name']]['related_functions'].append(func2['name'])
-                    self.function_relationships[func2['name']]['related_functions'].append(func1['name'])
-    
+        # Find related functions (share common calls or data). Instead of
+        # intersecting call sets for every pair, build an inverted index
+        # (call name -> functions making it) and count shared calls only
+        # for pairs that actually co-occur under some call.
+        call_index = defaultdict(list)
+        for idx, func in enumerate(functions):
+            for call in set(func.calls):
+                call_index[call].append(idx)
+
+        shared_counts = defaultdict(int)
+        for indices in call_index.values():
+            for a in range(len(indices) - 1):
+                idx1 = indices[a]
+                for b in range(a + 1, len(indices)):
+                    shared_counts[(idx1, indices[b])] += 1
+
+        # Filter while iterating items() so qualifying pairs are found without
+        # a second hash lookup per pair, and only those get sorted.
+        related_pairs = sorted(
+            pair for pair, count in shared_counts.items()
+            if count >= 2  # Share at least 2 common calls
+        )
+        for idx1, idx2 in related_pairs:
+            self.function_relationships[functions[idx1].name]['related_functions'].append(functions[idx2].name)
+            self.function_relationships[functions[idx2].name]['related_functions'].append(functions[idx1].name)
+
+        # Cohesion falls straight out of the relationship counts, so compute
+        # it here instead of re-walking the tables later.
+        if len(functions) < 2:
+            self.cohesion = 1.0
+        else:
+            possible_relationships = len(functions) * (len(functions) - 1) / 2
+            total_relationships = sum(
+                len(rel['called_by']) + len(rel['related_functions'])
+                for rel in self.function_relationships.values()
+            ) / 2  # each relationship is counted twice
+            if possible_relationships == 0:
+                self.cohesion = 1.0
+            else:
+                self.cohesion = min(1.0, total_relationships / possible_relationships)
+
     def _radon_analyze(self):
         """Perform Radon complexity analysis."""
         try:
             source_code = self.module_data['source']
             
-            # Cyclomatic Complexity
-            cc_results = cc_visit(source_code)
+            # Cyclomatic Complexity, on the tree parsed in _ast_analyze so
+            # radon doesn't re-parse the whole source. mi_visit has no AST
+            # entry point (it needs the raw text for Halstead/comments).
+            cc_results = cc_visit_ast(self.module_data['ast_tree'])
             
             # Maintainability Index
             mi_score = mi_visit(source_code, multi=True)
@@ -235,7 +508,7 @@ class SingleFileModularityAnalyzer:
             
             # Add complexity to individual functions
             for func in self.module_data['functions']:
-                func['complexity'] = self._find_complexity_for_function(cc_results, func['name'])
+                func.complexity = self._find_complexity_for_function(cc_results, func.name)
             
             # Store file-level scores
             self.complexity_scores = {
@@ -247,10 +520,12 @@ class SingleFileModularityAnalyzer:
                 'class_count': len(self.module_data['classes'])
             }
 
-            print(f"average complexity {average_complexity}\nmax {max_complexity}")
+            logger.debug("average complexity %s, max %s",
+                         self.complexity_scores['average_complexity'],
+                         self.complexity_scores['max_complexity'])
             
         except Exception as e:
-            print(f"Error analyzing with Radon: {e}")
+            logger.error("Error analyzing with Radon: %s", e)
     
     def _find_complexity_for_function(self, cc_results: List, func_name: str) -> int:
         """Find complexity score for a specific function."""
@@ -265,57 +540,93 @@ class SingleFileModularityAnalyzer:
             return 0.0
         return sum(cc.complexity for cc in cc_results) / len(cc_results)
     
+    def _shingle_set(self, text: str) -> Set[str]:
+        """5-gram character shingles used for the cheap similarity estimate."""
+        if len(text) <= 5:
+            return {text} if text else set()
+        return {text[k:k + 5] for k in range(len(text) - 4)}
+
     def _difflib_analyze(self):
         """Perform difflib similarity analysis within the file."""
         functions = self.module_data['functions']
-        
-        # Compare all functions against each other within the same file
-        for i, func1 in enumerate(functions):
-            for func2 in functions[i+1:]:
-                # Normalize and compare
-                norm1 = self._normalize_code(func1['source'])
-                norm2 = self._normalize_code(func2['source'])
-                
-                similarity = difflib.SequenceMatcher(None, norm1, norm2).ratio()
-                
-                if similarity > 0.7:  # 70% similar threshold for same file
-                    key = (func1['name'], func2['name'])
-                    
-                    self.duplication_map[key] = {
-                        'func1': func1['name'],
-                        'func2': func2['name'],
-                        'similarity': similarity,
-                        'source1': func1['source'],
-                        'source2': func2['source'],
-                        'line1': func1['lineno'],
-                        'line2': func2['lineno'],
-                        'complexity1': func1.get('complexity', 0),
-                        'complexity2': func2.get('complexity', 0)
-                    }
+
+        # Normalize and shingle each function once; a Jaccard estimate on the
+        # shingle sets weeds out clearly-dissimilar pairs so the expensive
+        # O(n*m) SequenceMatcher.ratio() only runs on real candidates.
+        norms = [self._normalize_code(f.source) for f in functions]
+        shingles = [self._shingle_set(norm) for norm in norms]
+
+        # Gather the upper-triangle pairs that survive the cheap prefilters,
+        # grouped by j so the scorer can reuse seq2 across a whole column.
+        candidates = []
+        for j in range(1, len(functions)):
+            set2 = shingles[j]
+            len2 = len(norms[j])
+            for i in range(j):
+                len1 = len(norms[i])
+                # ratio() can never exceed 2*min/(len1+len2); skip hopeless pairs
+                if len1 + len2 and 2 * min(len1, len2) / (len1 + len2) < 0.7:
+                    continue
+
+                set1 = shingles[i]
+                if set1 and set2:
+                    # Character shingles punish scattered edits hard — one
+                    # changed character kills up to five shingles — so pairs
+                    # with ratio() near 0.9 can sit around Jaccard 0.4. The
+                    # filter is approximate even at this conservative cutoff:
+                    # a borderline pair just above the 0.7 report threshold
+                    # can still land under 0.2 and be skipped, a trade
+                    # accepted for pruning the quadratic candidate space.
+                    intersection = len(set1 & set2)
+                    if intersection / (len(set1) + len(set2) - intersection) < 0.2:
+                        continue
+
+                candidates.append((i, j, norms[i], norms[j]))
+
+        # ratio() is CPU-bound pure computation, so very large candidate
+        # sets are partitioned across worker processes; typical files fall
+        # well under the threshold and score inline.
+        if len(candidates) >= _PARALLEL_PAIR_THRESHOLD:
+            chunks = [candidates[k:k + _PAIRS_PER_CHUNK]
+                      for k in range(0, len(candidates), _PAIRS_PER_CHUNK)]
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+                scored = [pair for chunk in pool.map(_score_pair_chunk, chunks)
+                          for pair in chunk]
+        else:
+            scored = _score_pair_chunk(candidates)
+
+        duplication_map = self.duplication_map
+        for i, j, similarity in scored:
+            func1 = functions[i]
+            func2 = functions[j]
+            duplication_map[(func1.name, func2.name)] = {
+                'func1': func1.name,
+                'func2': func2.name,
+                'similarity': similarity,
+                'source1': func1.source,
+                'source2': func2.source,
+                'line1': func1.lineno,
+                'line2': func2.lineno,
+                'complexity1': func1.complexity,
+                'complexity2': func2.complexity
+            }
     
     def _normalize_code(self, source: str) -> str:
         """Normalize code for comparison."""
         if not source:
             return ''
-        
-        lines = source.split('\n')
-        normalized = []
-        
-        for line in lines:
-            stripped = line.strip()
-            # Remove comments and empty lines
-            if stripped and not stripped.startswith('#'):
-                # Remove string literals for better structural comparison
-                normalized.append(stripped)
-        
-        return '\n'.join(normalized)
+
+        # One C-level regex pass: capture each non-blank, non-comment line
+        # with its surrounding whitespace stripped, instead of looping over
+        # split lines in bytecode.
+        return '\n'.join(_CODE_LINE_RE.findall(source))
     
     def _identify_modularity_issues(self) -> List[Dict[str, Any]]:
         """Identify modularity issues within the file."""
         issues = []
         
         # Issue 1: File is too large
-        if self.complexity_scores['size'] > 500:
+        if self.complexity_scores['size'] > _MAX_FILE_SLOC:
             issues.append({
                 'type': 'large_file',
                 'severity': 'high',
@@ -324,7 +635,7 @@ class SingleFileModularityAnalyzer:
             })
         
         # Issue 2: Too many functions (low cohesion indicator)
-        if self.complexity_scores['function_count'] > 20:
+        if self.complexity_scores['function_count'] > _MAX_FUNCTION_COUNT:
             issues.append({
                 'type': 'too_many_functions',
                 'severity': 'medium',
@@ -332,63 +643,69 @@ class SingleFileModularityAnalyzer:
                 'description': f"File has {self.complexity_scores['function_count']} functions. Consider organizing into classes or modules."
             })
         
-        # Issue 3: Complex functions
+        # Issue 3: Complex functions. Build the report entries directly so
+        # the filter and the report are one pass, not a list of records
+        # followed by a second comprehension over it.
         complex_functions = [
-            f for f in self.module_data['functions']
-            if f.get('complexity', 0) > 10
+            {'name': f.name, 'complexity': f.complexity, 'line': f.lineno}
+            for f in self.module_data['functions']
+            if f.complexity > _MAX_COMPLEXITY
         ]
         if complex_functions:
             issues.append({
                 'type': 'complex_functions',
                 'severity': 'high',
-                'functions': [{'name': f['name'], 'complexity': f['complexity'], 'line': f['lineno']} for f in complex_functions],
-                'description': f"{len(complex_functions)} functions have high complexity (>10)"
+                'functions': complex_functions,
+                'description': f"{len(complex_functions)} functions have high complexity (>{_MAX_COMPLEXITY})"
             })
-        
-        # Issue 4: Duplicate code within file
+
+        # Issue 4: Duplicate code within file. Only the count of very
+        # similar pairs matters (for severity), so don't build their list.
         if self.duplication_map:
-            high_similarity = [d for d in self.duplication_map.values() if d['similarity'] > 0.85]
+            high_similarity = sum(1 for d in self.duplication_map.values() if d['similarity'] > _HIGH_SIMILARITY)
             if high_similarity:
                 issues.append({
                     'type': 'internal_duplication',
-                    'severity': 'high' if len(high_similarity) > 3 else 'medium',
+                    'severity': 'high' if high_similarity > 3 else 'medium',
                     'duplicates': list(self.duplication_map.values()),
                     'count': len(self.duplication_map),
                     'description': f"{len(self.duplication_map)} pairs of similar functions found"
                 })
-        
-        # Issue 5: Orphan functions (not called by anything)
+
+        # Issue 5: Orphan functions (not called by anything); only the
+        # names are reported, so collect those rather than whole records.
         orphan_functions = [
-            f for f in self.module_data['functions']
-            if not f['is_private'] 
-            and len(self.function_relationships.get(f['name'], {}).get('called_by', [])) == 0
-            and f['name'] not in ['main', '__init__']
-            and 'test_' not in f['name']
+            f.name for f in self.module_data['functions']
+            if not f.is_private
+            and len(self.function_relationships.get(f.name, {}).get('called_by', [])) == 0
+            and f.name not in ['main', '__init__']
+            and 'test_' not in f.name
         ]
-        if len(orphan_functions) > 5:
+        if len(orphan_functions) > _MAX_ORPHAN_FUNCTIONS:
             issues.append({
                 'type': 'orphan_functions',
                 'severity': 'low',
-                'functions': [f['name'] for f in orphan_functions],
+                'functions': orphan_functions,
                 'count': len(orphan_functions),
                 'description': f"{len(orphan_functions)} functions are never called internally"
             })
-        
+
         # Issue 6: God functions (too long)
         god_functions = [
-            f for f in self.module_data['functions']
-            if len(f['source'].split('\n')) > 50
+            {'name': f.name, 'lines': f.line_count, 'line': f.lineno}
+            for f in self.module_data['functions']
+            if f.line_count > _MAX_FUNCTION_LINES
         ]
         if god_functions:
             issues.append({
                 'type': 'god_functions',
                 'severity': 'medium',
-                'functions': [{'name': f['name'], 'lines': len(f['source'].split('\n')), 'line': f['lineno']} for f in god_functions],
-                'description': f"{len(god_functions)} functions are too long (>50 lines)"
+                'functions': god_functions,
+                'description': f"{len(god_functions)} functions are too long (>{_MAX_FUNCTION_LINES} lines)"
             })
         
         # Issue 7: Low maintainability
-        if self.complexity_scores['maintainability'] < 65:
+        if self.complexity_scores['maintainability'] < _MIN_MAINTAINABILITY:
             issues.append({
                 'type': 'low_maintainability',
                 'severity': 'high',
@@ -397,8 +714,8 @@ class SingleFileModularityAnalyzer:
             })
         
         # Issue 8: Mixed responsibilities (many unrelated functions)
-        cohesion = self._calculate_file_cohesion()
-        if cohesion < 0.3 and self.complexity_scores['function_count'] > 10:
+        cohesion = self.cohesion
+        if cohesion < _MIN_COHESION and self.complexity_scores['function_count'] > _MIN_COHESION_FUNCTIONS:
             issues.append({
                 'type': 'mixed_responsibilities',
                 'severity': 'medium',
@@ -407,7 +724,7 @@ class SingleFileModularityAnalyzer:
             })
         
         # Issue 9: No classes (procedural style with many functions)
-        if self.complexity_scores['class_count'] == 0 and self.complexity_scores['function_count'] > 15:
+        if self.complexity_scores['class_count'] == 0 and self.complexity_scores['function_count'] > _MIN_PROCEDURAL_FUNCTIONS:
             issues.append({
                 'type': 'procedural_style',
                 'severity': 'low',
@@ -421,29 +738,6 @@ class SingleFileModularityAnalyzer:
         
         return issues
     
-    def _calculate_file_cohesion(self) -> float:
-        """Calculate cohesion of functions in the file."""
-        functions = self.module_data['functions']
-        
-        if len(functions) < 2:
-            return 1.0
-        
-        # Count how many functions are related to each other
-        total_relationships = 0
-        possible_relationships = len(functions) * (len(functions) - 1) / 2
-        
-        for func_name, relationships in self.function_relationships.items():
-            total_relationships += len(relationships['called_by'])
-            total_relationships += len(relationships['related_functions'])
-        
-        # Divide by 2 since we count each relationship twice
-        total_relationships = total_relationships / 2
-        
-        if possible_relationships == 0:
-            return 1.0
-        
-        return min(1.0, total_relationships / possible_relationships)
-    
     def _generate_refactoring_plan(self, issues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Generate refactoring suggestions for identified issues."""
         suggestions = []
@@ -484,8 +778,17 @@ class SingleFileModularityAnalyzer:
             elif issue['type'] == 'orphan_functions':
                 suggestion = self._handle_orphan_functions(issue)
                 suggestions.append(suggestion)
-        
+
+        # Tallied here, at production time, so each summary render reads
+        # the finished counters instead of re-scanning the suggestions.
+        self._count_issue_buckets(suggestions)
+
         return suggestions
+
+    def _count_issue_buckets(self, suggestions: List[Dict[str, Any]]):
+        """Record per-severity and per-type issue counts for the summary."""
+        self._severity_counts = Counter(s['issue']['severity'] for s in suggestions)
+        self._type_counts = Counter(s['issue']['type'] for s in suggestions)
     
     def _handle_internal_duplication(self, issue: Dict[str, Any]) -> Dict[str, Any]:
         """Handle internal code duplication."""
@@ -516,7 +819,8 @@ class SingleFileModularityAnalyzer:
         """Handle large file issue."""
         # Cluster functions by relationships
         clusters = self._cluster_functions()
-        
+        line_counts = {f.name: f.line_count for f in self.module_data['functions']}
+
         return {
             'action': 'split_file',
             'issue': issue,
@@ -532,7 +836,7 @@ class SingleFileModularityAnalyzer:
             'estimated_impact': {
                 'new_files': len(clusters),
                 'current_size': issue['metrics']['size'],
-                'estimated_new_sizes': [len(c) * 20 for c in clusters]  # Rough estimate
+                'estimated_new_sizes': [sum(line_counts.get(name, 0) for name in c) for c in clusters]
             }
         }
     
@@ -680,36 +984,298 @@ class SingleFileModularityAnalyzer:
         }
     
     def _cluster_functions(self) -> List[List[str]]:
-        """Cluster functions by relationships."""
+        """Cluster functions by relationships using union-find.
+
+        The old first-come greedy scan never merged clusters that a later
+        relationship connected transitively; union-find over the
+        related_functions edges groups every connected component in
+        near-linear time.
+        """
         functions = self.module_data['functions']
-        clusters = []
-        assigned = set()
-        
-        for func in functions:
-            if func['name'] in assigned:
-                continue
-            
-            # Start new cluster
-            cluster = [func['name']]
-            assigned.add(func['name'])
-            
-            # Add related functions
-            relationships = self.function_relationships.get(func['name'], {})
-            for related in relationships.get('related_functions', []):
-                if related not in assigned:
-                    cluster.append(related)
-                    assigned.add(related)
-            
-            if cluster:
-                clusters.append(cluster)
-        
-        # Add unassigned functions to smallest cluster or create new
-        unassigned = [f['name'] for f in functions if f['name'] not in assigned]
-        if unassigned:
-            if clusters:
-                clusters[0].extend(unassigned)
+        names = [f.name for f in functions]
+        parent = {name: name for name in names}
+
+        def find(name: str) -> str:
+            root = name
+            while parent[root] != root:
+                root = parent[root]
+            while parent[name] != root:  # path compression
+                parent[name], name = root, parent[name]
+            return root
+
+        for name, rel in self.function_relationships.items():
+            for related in rel['related_functions']:
+                root1, root2 = find(name), find(related)
+                if root1 != root2:
+                    parent[root2] = root1
+
+        # Group members under their root, keeping definition order within
+        # and across clusters; unrelated functions stay singletons.
+        clusters_by_root = {}
+        for name in names:
+            clusters_by_root.setdefault(find(name), []).append(name)
+
+        return list(clusters_by_root.values())
+
+    def print_summary(self, suggestions: List[Dict[str, Any]]):
+        """Print a human-readable summary of the analysis results."""
+        # Lines are buffered and flushed with one write at the end, instead
+        # of a locked stdout write (and possibly a syscall) per print call.
+        buf = []
+        _emit = buf.append
+
+        _emit(_BAR)
+        _emit("FILE MODULARITY ANALYSIS SUMMARY")
+        _emit(_BAR)
+        _emit(f"File: {self.module_data['path']}")
+        _emit("")
+        _emit(f"Functions: {self.complexity_scores.get('function_count', 0)}")
+        _emit(f"Classes: {self.complexity_scores.get('class_count', 0)}")
+        _emit(f"Size: {self.complexity_scores.get('size', 0)} SLOC")
+        _emit(f"Average complexity: {self.complexity_scores.get('average_complexity', 0):.2f}")
+        _emit(f"Max complexity: {self.complexity_scores.get('max_complexity', 0)}")
+        _emit(f"Maintainability index: {self.complexity_scores.get('maintainability', 0):.2f}")
+        _emit(f"Cohesion: {self.cohesion:.2f}")
+        _emit("")
+
+        # Counts were tallied when the suggestions were produced.
+        severity_counts = self._severity_counts
+        type_counts = self._type_counts
+
+        _emit("ISSUES BY SEVERITY")
+        _emit(_RULE)
+        # Filter to the severities that occurred, then emit the block in
+        # one go; no per-level zero check in the output path.
+        present = [f"  {severity.upper()}: {severity_counts[severity]}"
+                   for severity in _SEVERITY_ORDER if severity in severity_counts]
+        if present:
+            _emit("\n".join(present))
+        _emit("")
+
+        _emit("ISSUES BY TYPE")
+        _emit(_RULE)
+        for issue_type, count in type_counts.most_common():
+            _emit(f"  {_pretty(issue_type)}: {count}")
+        _emit("")
+
+        _emit(_BAR)
+        _emit("TOP ISSUES")
+        _emit(_BAR)
+        # islice avoids copying the head of the list, and the issue dict is
+        # bound once per suggestion instead of re-probed for every field.
+        for i, suggestion in enumerate(islice(suggestions, 5), 1):
+            issue = suggestion['issue']
+            _emit(f"{i}. [{issue['severity'].upper()}] {_pretty(issue['type'])}")
+            _emit(f"   {issue['description']}")
+            _emit(f"   Suggested action: {_pretty(suggestion['action'])}")
+            for step in islice(suggestion.get('steps', ()), 3):
+                _emit(f"     - {step['description']}")
+            _emit("")
+
+        _emit(_BAR)
+        _emit("MOST COMPLEX FUNCTIONS")
+        _emit(_BAR)
+        # nlargest keeps a 5-element heap: O(N log 5) instead of sorting
+        # the whole function list to throw most of it away.
+        complex_funcs = heapq.nlargest(5, self.module_data['functions'],
+                                       key=attrgetter('complexity'))
+        for func in complex_funcs:
+            _emit(f"  {func.name} (line {func.lineno}): complexity {func.complexity}")
+        _emit("")
+
+        _emit(_BAR)
+        _emit("FUNCTION CALL GRAPH (Top 5 Most Called)")
+        _emit(_BAR)
+        # Caller counts are materialized once so len() isn't paid again in
+        # the report loop below.
+        most_called = heapq.nlargest(
+            5,
+            ((name, len(rel['called_by'])) for name, rel in self.function_relationships.items()),
+            key=itemgetter(1)
+        )
+        for name, called_by_count in most_called:
+            _emit(f"  {name}: called by {called_by_count} function(s)")
+        _emit(_BAR)
+
+        sys.stdout.write("\n".join(buf))
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+
+    def generate_diff_preview(self, suggestion: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Generate diff-style previews for a suggestion's refactoring steps."""
+        diffs = []
+
+        # Steps are reduced to a hashable canonical key and rendered through
+        # a cached module-level builder, so re-rendering the same suggestion
+        # (summary plus previews plus export over one analysis, or repeated
+        # views) reuses the built strings.
+        for step in suggestion.get('steps', []):
+            step_type = step['type']
+            if step_type == 'break_down_function':
+                key = (step_type, step['function'], step['line'],
+                       step['complexity'], step['description'])
+            elif step_type == 'extract_methods':
+                key = (step_type, step['function'], step['line'],
+                       step['lines'], step['description'])
+            elif step_type == 'create_module':
+                key = (step_type, step['name'], step['description'],
+                       tuple(step['functions']))
+            elif step_type == 'identify_common_code':
+                key = (step_type, step['description'],
+                       tuple(map(tuple, step['duplicate_pairs'])))
             else:
-                clusters.append(unassigned)
-        
-        return clusters
+                continue
+
+            title, diff_text = _build_step_diff(key)
+            diffs.append({'title': title, 'diff': diff_text})
+
+        return diffs
+
+    def export_results(self, suggestions: List[Dict[str, Any]],
+                       output_file: str = 'analysis_results.json'):
+        """Export the analysis results to a JSON file."""
+        report = {
+            'file': self.module_data['path'],
+            'scores': self.complexity_scores,
+            'cohesion': self.cohesion,
+            'suggestions': suggestions
+        }
+        # Serialize to one buffer and write it in a single call; json.dump's
+        # incremental writer issues many small writes through the text layer.
+        if orjson is not None:
+            Path(output_file).write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        else:
+            Path(output_file).write_text(json.dumps(report, indent=2), encoding='utf-8')
+        logger.info("Results exported to %s", output_file)
     
+
+class _AstCollector:
+    """Single-pass collector that gathers functions, classes and imports.
+
+    Calls and return statements are attributed to every function on the
+    enclosing stack, matching the old per-function ast.walk behaviour
+    without re-traversing each function's subtree.
+    """
+
+    # Sentinel placed on the walk stack when entering a function body; popping
+    # it means the body is done and the enclosing-function stack shrinks.
+    _POP_FUNC = object()
+
+    def __init__(self, analyzer: 'SingleFileModularityAnalyzer', source_code: str):
+        self.analyzer = analyzer
+        self.source_code = source_code
+        self.functions = []
+        self.classes = []
+        self.imports = []
+        self._func_stack = []
+
+        # ast column offsets are utf-8 byte offsets, so slice the encoded
+        # source; one scan builds the line-start table and every segment
+        # lookup after that is O(1) instead of get_source_segment's
+        # per-call split of the whole file.
+        src_bytes = source_code.encode('utf-8')
+        line_starts = [0]
+        idx = src_bytes.find(b'\n')
+        while idx != -1:
+            line_starts.append(idx + 1)
+            idx = src_bytes.find(b'\n', idx + 1)
+        self._src_bytes = src_bytes
+        self._line_starts = line_starts
+
+    def _segment(self, node: ast.AST) -> str:
+        """Source text for a node, via the precomputed line offsets."""
+        try:
+            start = self._line_starts[node.lineno - 1] + node.col_offset
+            end = self._line_starts[node.end_lineno - 1] + node.end_col_offset
+        except (IndexError, TypeError):
+            return ''
+        return self._src_bytes[start:end].decode('utf-8', errors='replace')
+
+    def collect(self, tree: ast.AST):
+        """Walk the tree with an explicit stack instead of NodeVisitor.
+
+        The recursive visitor spends a method lookup and a Python call
+        frame on every node; one loop with exact class checks keeps the
+        same pre-order traversal without either. Most nodes fall through
+        the dispatch chain and just have their children pushed.
+        """
+        analyzer = self.analyzer
+        func_stack = self._func_stack
+        pop_func = self._POP_FUNC
+        iter_child_nodes = ast.iter_child_nodes
+        stack = [tree]
+        push = stack.append
+        while stack:
+            node = stack.pop()
+            if node is pop_func:
+                func_stack.pop()
+                continue
+            cls = node.__class__
+            if cls is ast.Call:
+                call_name = analyzer._get_call_name(node)
+                if call_name:
+                    for func in func_stack:
+                        func.calls.append(call_name)
+            elif cls is ast.Return:
+                if node.value is not None:
+                    for func in func_stack:
+                        func.returns = True
+            elif cls is ast.FunctionDef:
+                function_info = FunctionInfo(
+                    name=node.name,
+                    lineno=node.lineno,
+                    end_lineno=node.end_lineno,
+                    args=analyzer._extract_arguments(node),
+                    calls=[],
+                    returns=False,
+                    is_private=node.name.startswith('_'),
+                    source=self._segment(node),
+                    decorators=[analyzer._get_decorator_name(d) for d in node.decorator_list]
+                )
+                self.functions.append(function_info)
+                func_stack.append(function_info)
+                # Children land above the sentinel, so it pops exactly when
+                # this function's subtree is exhausted.
+                push(pop_func)
+            elif cls is ast.ClassDef:
+                class_info = {
+                    'name': node.name,
+                    'lineno': node.lineno,
+                    'end_lineno': node.end_lineno,
+                    'methods': [n.name for n in node.body if isinstance(n, ast.FunctionDef)],
+                    'bases': [analyzer._get_name(base) for base in node.bases],
+                    'source': self._segment(node),
+                    'is_private': node.name.startswith('_')
+                }
+                self.classes.append(class_info)
+            elif cls is ast.Import or cls is ast.ImportFrom:
+                self.imports.append(analyzer._extract_import_info(node))
+                continue  # alias children carry nothing we track
+            # Reversed so the leftmost child is popped first (pre-order).
+            for child in reversed(list(iter_child_nodes(node))):
+                push(child)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if len(sys.argv) < 2:
+        print("Usage: python test_backend.py <file.py>")
+        sys.exit(1)
+
+    analyzer = SingleFileModularityAnalyzer(sys.argv[1])
+    suggestions = analyzer.analyze_file()
+    analyzer.print_summary(suggestions)
+
+    # Previews are buffered the same way as the summary: collect every
+    # line, then hand stdout one block.
+    preview = [_BAR, "REFACTORING PREVIEWS", _BAR]
+    for suggestion in suggestions:
+        for diff in analyzer.generate_diff_preview(suggestion):
+            preview.append(f"--- {diff['title']} ---")
+            preview.append(diff['diff'])
+    sys.stdout.write("\n".join(preview))
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+
+    analyzer.export_results(suggestions)
@@ -21,12 +21,10 @@ export default function EditPage({ code, setCode }: EditPageProps) {
     setIsAnalyzing(true);
 
     try {
-      const formData = new FormData();
-      formData.append("code", code);
-
       const response = await fetch("http://localhost:8000/analyze", {
         method: "POST",
-        body: formData,
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ code }),
       });
 
       if (!response.ok) {